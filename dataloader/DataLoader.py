@@ -1,12 +1,24 @@
+import hashlib
+import io
 import os.path
 import re
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 import numpy as np
 import pandas as pd
 import time
 from dataclasses import dataclass
 
 
-@dataclass
+DEVICE_BY_LENGTH = {1015: 'Renishaw', 1024: 'Andor', 3648: 'CCS'}
+ADC_16BIT_DEVICES = set(DEVICE_BY_LENGTH.values())
+COUNTS_DTYPE = np.float32  # counts from a 16-bit ADC are exact in single precision
+
+
+@dataclass(slots=True)
 class Spectrum:
     xdata: np.ndarray
     ydata: np.ndarray
@@ -25,14 +37,10 @@ class Spectrum:
     highlight: bool = False
 
     def __post_init__(self):
-        if self.xdata.shape[0] == 1015:
-            self.device = 'Renishaw'
-        elif self.xdata.shape[0] == 1024:
-            self.device = 'Andor'
-        elif self.xdata.shape[0] == 3648:
-            self.device = 'CCS'
-        else:
-            self.device = 'Unknown'
+        if not self.device:  # guess from the number of pixels unless given in the header
+            self.device = DEVICE_BY_LENGTH.get(self.xdata.shape[0], 'Unknown')
+        if self.device in ADC_16BIT_DEVICES:  # xdata is the calibration and stays as it is
+            self.ydata = self.ydata.astype(COUNTS_DTYPE, copy=False)
 
     def reset_appearance(self) -> None:
         self.color = 'black'
@@ -42,37 +50,134 @@ class Spectrum:
         self.highlight = False
 
 
-def extract_keyword(lines: list, keyword: str) -> str:
-    pattern = re.compile(f'^# {keyword}: (.*)$')
-    matched = [pattern.match(line).group(1) for line in lines if pattern.match(line)]
+KEYWORDS = ['abs_path_raw', 'abs_path_ref', 'calibration', 'description', 'fitting_function', 'fitting_range', 'fitting_values', 'device']
+HEADER_PATTERN = re.compile(f'^# (?P<key>{"|".join(KEYWORDS)}): (?P<value>.*)$', re.MULTILINE)
 
-    if len(matched) == 0:
-        value = None
-    elif len(matched) == 1:
-        value = matched[0]
-    else:
-        raise ValueError(f'Keyword {keyword} is duplicated.')
 
-    if value == '':
-        value = None
-
-    return value
+def extract_keywords(text: str) -> dict:
+    values = dict.fromkeys(KEYWORDS)
+    found = set()
+    for matched in HEADER_PATTERN.finditer(text):
+        keyword = matched['key']
+        if keyword in found:
+            raise ValueError(f'Keyword {keyword} is duplicated.')
+        found.add(keyword)
+        values[keyword] = matched['value'] or None
+    return values
 
 
 NUMERIC_PATTERN = r'[+-]?\d+(?:\.\d+)?'
 SEP_PATTERN = r'[ ,\t]+'
 IS_NUMERIC = re.compile(NUMERIC_PATTERN)
 IS_NUMERIC_SEP_NUMERIC = re.compile(fr'^({NUMERIC_PATTERN})({SEP_PATTERN})({NUMERIC_PATTERN})') # for finding the separator
-IS_NUMERIC_ROW = re.compile(f'^({NUMERIC_PATTERN}{SEP_PATTERN})*{NUMERIC_PATTERN}$')
-
-
-def find_skip(lines: list) -> int:
-    for i, line in enumerate(lines):
-        if IS_NUMERIC_ROW.match(line):
-            break
-    else:  # if all lines are non-numeric
-        i = -1
-    return i
+NUMERIC_ROW_PATTERN = f'^{NUMERIC_PATTERN}(?:{SEP_PATTERN}{NUMERIC_PATTERN})*$'  # the leading number is factored out so that matching stays linear in the line length
+IS_NUMERIC_ROW = re.compile(NUMERIC_ROW_PATTERN)
+SKIP_PATTERN = re.compile(NUMERIC_ROW_PATTERN, re.MULTILINE)  # for scanning the whole text at once
+
+
+def find_skip(text: str, reverse: bool = False) -> int:
+    # returns the number of lines before the first numeric line (after the last numeric line if reverse)
+    if not reverse:
+        matched = SKIP_PATTERN.search(text)
+        if matched is None:  # if all lines are non-numeric
+            return -1
+        return text.count('\n', 0, matched.start())
+
+    # walk back line by line from the end and stop at the first numeric line
+    end = len(text) - text.endswith('\n')
+    i = 0
+    while True:
+        start = text.rfind('\n', 0, end) + 1
+        if SKIP_PATTERN.match(text, start, end):
+            return i
+        if start == 0:  # if all lines are non-numeric
+            return -1
+        end = start - 1
+        i += 1
+
+
+def line_start(text: str, n: int) -> int:
+    # offset of the n-th line (0-indexed)
+    pos = 0
+    for _ in range(n):
+        pos = text.index('\n', pos) + 1
+    return pos
+
+
+def line_start_from_end(text: str, n: int) -> int:
+    # offset where the last n lines begin (the end of text if n == 0)
+    if n == 0:
+        return len(text)
+    pos = len(text) - text.endswith('\n')
+    for _ in range(n):
+        pos = text.rindex('\n', 0, pos)
+    return pos + 1
+
+
+def read_text(filename: str) -> str:
+    # read the whole file at once, raises UnicodeDecodeError if it is neither UTF-8 nor Shift_JIS
+    raw = Path(filename).read_bytes()
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        text = raw.decode('cp932')
+    return text.replace('\r\n', '\n').replace('\r', '\n')  # same newline handling as open(filename, 'r')
+
+
+CACHE_DIR = Path.home() / '.cache' / 'dataloader'  # pass as DataLoader(cache_dir=CACHE_DIR) to enable the cache
+CACHE_VERSION = 1  # bump when the parser or the cached data changes
+CACHE_MAX_FILES = 1000
+CACHE_SUFFIX = '.dlcache.npz'  # only files with this suffix are treated as cache entries
+
+
+def cache_path(filename: str, cache_dir: Path) -> Path:
+    # the cache is invalidated when the file is modified or the cache format changes
+    stat = os.stat(filename)
+    key = f'{CACHE_VERSION}|{os.path.abspath(filename)}|{stat.st_mtime_ns}|{stat.st_size}'
+    return Path(cache_dir) / f'{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}{CACHE_SUFFIX}'
+
+
+def load_cache(path: Path) -> tuple[str, np.ndarray] | None:
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            return str(npz['header']), npz['data']
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def save_cache(path: Path, header: str, data: np.ndarray) -> bool:
+    # write to a temporary file first so that other threads never read a half-written cache
+    tmp_path = path.with_suffix(f'.{os.getpid()}.{id(data)}.tmp')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, header=np.array(header), data=data)
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def count_cache(cache_dir: Path) -> int:
+    return sum(1 for _ in Path(cache_dir).glob(f'*{CACHE_SUFFIX}'))
+
+
+def prune_cache(cache_dir: Path, max_files: int = CACHE_MAX_FILES) -> int:
+    # remove the least recently written entries, other files in cache_dir are left untouched
+    entries = []
+    for entry in Path(cache_dir).glob(f'*{CACHE_SUFFIX}'):
+        try:
+            entries.append((entry.stat().st_mtime_ns, entry))
+        except OSError:
+            pass
+    entries.sort(reverse=True)
+    for _, entry in entries[max_files:]:
+        try:
+            entry.unlink()
+        except OSError:
+            pass
+    return min(len(entries), max_files)  # number of entries left
 
 
 def find_sep(line):
@@ -83,9 +188,25 @@ def find_sep(line):
         return matched.group(2)
 
 
+def read_numeric(buf: str, sep: str) -> np.ndarray:
+    # comma or whitespace separators are parsed in C by np.loadtxt, others fall back to pandas
+    delimiter = sep.strip() or None
+    if delimiter in [None, ',']:
+        try:
+            return np.loadtxt(io.StringIO(buf), delimiter=delimiter, ndmin=2)
+        except ValueError:
+            pass
+    df = pd.read_csv(io.StringIO(buf), engine='python', sep=sep, header=None)
+    return df.to_numpy(dtype=np.float64, copy=False)
+
+
 class DataLoader:
-    def __init__(self, filename: str = None, filenames: list = None):
+    def __init__(self, filename: str = None, filenames: list = None, cache_dir: Path | None = None):
         self.spec_dict: dict[str: Spectrum] = {}
+        self.cache_dir = cache_dir  # the parse cache is used only if a directory is given
+        self.cache_count = None  # number of entries in cache_dir, counted on the first write
+        self.cache_max_files = CACHE_MAX_FILES
+        self.cache_lock = threading.Lock()
 
         if filename is not None:
             self.load_file(filename)
@@ -96,28 +217,63 @@ class DataLoader:
         if filename in self.spec_dict.keys():
             print(f'このファイルは既に読み込まれています：{filename}')
             return False
-        try:
-            with open(filename, 'r') as f:
-                lines = f.readlines()
-        except UnicodeDecodeError:
-            print('非対応のファイル形式です')
+        spec_dict = self._parse_one(filename)
+        self._prune_cache()
+        if spec_dict is None:
             return False
+        self.spec_dict.update(spec_dict)
+        return True
 
-        skiprows = find_skip(lines)
-        if skiprows == -1:
-            raise ValueError('No numeric data found. Check the input file again.')
-        skipfooter = find_skip(lines[::-1])
-
+    def _count_cache_write(self) -> None:
+        with self.cache_lock:
+            if self.cache_count is None:
+                self.cache_count = count_cache(self.cache_dir)  # includes the entry just written
+            else:
+                self.cache_count += 1
+
+    def _prune_cache(self) -> None:
+        # called once per load_file/load_files, and only scans cache_dir when the limit is exceeded
+        if self.cache_count is not None and self.cache_count > self.cache_max_files:
+            self.cache_count = prune_cache(self.cache_dir, self.cache_max_files)
+
+    def _parse_one(self, filename: str) -> dict | None:
+        # does not touch self.spec_dict so that it can be run in worker threads
+        path = None if self.cache_dir is None else cache_path(filename, self.cache_dir)
+        cached = None if path is None else load_cache(path)
+        if cached is not None:
+            header_text, data = cached
+        else:
+            try:
+                text = read_text(filename)
+            except UnicodeDecodeError:
+                print('非対応のファイル形式です')
+                return None
+
+            skiprows = find_skip(text)
+            if skiprows == -1:
+                raise ValueError('No numeric data found. Check the input file again.')
+            skipfooter = find_skip(text, reverse=True)
+            start = line_start(text, skiprows)
+            end = line_start_from_end(text, skipfooter)
+
+            header_text = text[:start]
+            first_line_end = text.find('\n', start, end)
+            sep = find_sep(text[start:end if first_line_end == -1 else first_line_end])
+            data = read_numeric(text[start:end], sep)
+            if path is not None and save_cache(path, header_text, data):
+                self._count_cache_write()
+
+        header = extract_keywords(header_text)
         spectrum_dict = {}
-        for keyword in ['abs_path_raw', 'abs_path_ref', 'calibration', 'description', 'fitting_function', 'fitting_range', 'fitting_values', 'device']:
-            value = extract_keyword(lines, keyword)
+        for keyword in KEYWORDS:
+            value = header[keyword]
 
             if keyword == 'abs_path_raw':
                 if value is None:
                     value = filename
             elif keyword == 'description':
                 if spectrum_dict.get('abs_path_raw') == filename:  # if itself is the raw data
-                    value = lines[:skiprows]
+                    value = [line + '\n' for line in header_text.split('\n')[:-1]]  # header_text always ends with a newline
             elif keyword == 'fitting_range':
                 if value is not None:
                     value = list(map(float, value.split(', ')))
@@ -131,46 +287,64 @@ class DataLoader:
 
             spectrum_dict[keyword] = value
 
-        sep = find_sep(lines[skiprows])
-        df = pd.read_csv(filename, engine='python', encoding='cp932', sep=sep, skiprows=skiprows, skipfooter=skipfooter, header=None)
-        if df.shape[1] == 1:
-            spectrum_dict['xdata'] = np.arange(1, df.shape[0] + 1)
-            spectrum_dict['ydata'] = df.iloc[:, 0].values
-            self.spec_dict[filename] = Spectrum(**spectrum_dict)
+        spec_dict = {}
+        if data.shape[1] == 1:
+            spectrum_dict['xdata'] = np.arange(1, data.shape[0] + 1, dtype=np.int32)
+            spectrum_dict['ydata'] = data[:, 0]
+            spec_dict[filename] = Spectrum(**spectrum_dict)
             print('Only one column is found. The first column is used as ydata.')
-        elif df.shape[1] == 2:
-            spectrum_dict['xdata'] = df.iloc[:, 0].values
-            spectrum_dict['ydata'] = df.iloc[:, 1].values
-            self.spec_dict[filename] = Spectrum(**spectrum_dict)
+        elif data.shape[1] == 2:
+            spectrum_dict['xdata'] = data[:, 0]
+            spectrum_dict['ydata'] = data[:, 1]
+            spec_dict[filename] = Spectrum(**spectrum_dict)
         else:
-            spectrum_dict['xdata'] = df.iloc[:, 0].values
-            spectrum_dict['ydata'] = df.iloc[:, 1:].values.T
-            for i, ydata in enumerate(spectrum_dict['ydata']):
-                tmp_dict = spectrum_dict.copy()
-                tmp_dict['ydata'] = ydata
-                if i == 0:
-                    self.spec_dict[filename] = Spectrum(**tmp_dict)
-                else:
-                    self.spec_dict[f'{filename}({i})'] = Spectrum(**tmp_dict)
+            data = np.asfortranarray(data)  # make each column contiguous
+            xdata = data[:, 0]
+            for i in range(1, data.shape[1]):
+                key = filename if i == 1 else f'{filename}({i - 1})'
+                spec_dict[key] = Spectrum(xdata=xdata, ydata=data[:, i], **spectrum_dict)
 
-        return True
+        return spec_dict
 
     def load_files(self, filenames: list) -> dict:
+        # parse in worker threads, then merge into self.spec_dict in the given order
+        to_parse = [filename for filename in dict.fromkeys(filenames) if filename not in self.spec_dict.keys()]
         ok_dict = {}
-        for filename in filenames:
-            ok = self.load_file(filename)
-            ok_dict[filename] = ok
+        error = None
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = {filename: executor.submit(self._parse_one, filename) for filename in to_parse}
+            for filename in filenames:
+                if filename in self.spec_dict.keys() or filename not in futures:
+                    print(f'このファイルは既に読み込まれています：{filename}')
+                    ok_dict[filename] = False
+                    continue
+                try:
+                    spec_dict = futures.pop(filename).result()
+                except Exception as e:
+                    # keep the files that were loaded successfully and raise the first error at the end
+                    if error is None:
+                        error = e
+                    ok_dict[filename] = False
+                    continue
+                if spec_dict is None:
+                    ok_dict[filename] = False
+                    continue
+                self.spec_dict.update(spec_dict)
+                ok_dict[filename] = True
+        self._prune_cache()
+        if error is not None:
+            raise error
         return ok_dict
 
     def concat_spec(self) -> pd.DataFrame:
-        xdata_list = []
-        ydata_list = []
-        for spec in self.spec_dict.values():
-            xdata_list.append(spec.xdata)
-            ydata_list.append(spec.ydata)
-        xdata_all = np.hstack(xdata_list)
-        ydata_all = np.hstack(ydata_list)
-        data = np.vstack([xdata_all, ydata_all]).T
+        specs = list(self.spec_dict.values())
+        sizes = [spec.xdata.size for spec in specs]
+        data = np.empty((sum(sizes), 2), dtype=np.float64)
+        offset = 0
+        for spec, size in zip(specs, sizes):
+            data[offset:offset + size, 0] = spec.xdata
+            data[offset:offset + size, 1] = spec.ydata
+            offset += size
         df = pd.DataFrame(data=data, columns=['x', 'y'])
         return df
 
@@ -191,7 +365,6 @@ class DataLoader:
 
     def save(self, filename: str, filename_as: str = None) -> str:
         spec = self.spec_dict[filename]
-        data = np.vstack((spec.xdata.T, spec.ydata.T)).T
         if filename_as is None:
             filename_as = f'{os.path.splitext(filename)[0]}_{time.time()}{os.path.splitext(filename)[1]}'
         with open(filename_as, 'w') as f:
@@ -204,8 +377,11 @@ class DataLoader:
             f.write(f'# fitting_range: {", ".join(map(str, spec.fitting_range)) if spec.fitting_range else ""}\n')
             f.write(f'# fitting_values: {", ".join(map(str, spec.fitting_values)) if spec.fitting_values else ""}\n')
 
-            for x, y in data:
-                f.write(f'{x},{y}\n')
+            # shortest representation of each value in its own dtype, written in one call
+            # (np.savetxt formats row by row in Python and is slower than this)
+            rows = zip(spec.xdata.astype(str).tolist(), spec.ydata.astype(str).tolist())
+            if spec.xdata.size > 0:
+                f.write('\n'.join(map(','.join, rows)) + '\n')
 
         return filename_as
 
@@ -224,17 +400,53 @@ def test():
     assert not is_numeric('1, 2, 3,')
     assert not is_numeric('1, 2e')
     assert not is_numeric('-111,--100')
+    assert not is_numeric('1, ' * 10000 + 'a')
     print('is_numeric: OK')
 
+    # Spectrum
+    def spectrum(length: int, device: str | None) -> Spectrum:
+        return Spectrum(np.arange(length), np.zeros(length), device, None, None, None, None, None, [], [])
+    assert spectrum(1024, None).device == 'Andor'
+    assert spectrum(3648, '').device == 'CCS'
+    assert spectrum(10, None).device == 'Unknown'
+    assert spectrum(1024, 'Renishaw').device == 'Renishaw'
+    assert spectrum(1024, None).ydata.dtype == COUNTS_DTYPE
+    assert spectrum(1024, None).xdata.dtype == np.arange(1).dtype
+    assert spectrum(10, None).ydata.dtype == np.float64
+    assert not hasattr(spectrum(10, None), '__dict__')
+    print('Spectrum: OK')
+
+    # extract_keywords
+    header = extract_keywords('text\n# abs_path_raw: raw.txt\n# calibration: \n# device: CCS\n')
+    assert header['abs_path_raw'] == 'raw.txt'
+    assert header['calibration'] is None
+    assert header['device'] == 'CCS'
+    assert header['fitting_range'] is None
+    try:
+        extract_keywords('# device: CCS\n# device: Andor\n')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('duplicated keyword is not detected')
+    print('extract_keywords: OK')
+
     # find_skip
-    lines = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i']
-    assert find_skip(lines) == -1
-    lines = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', '1, 2, 3']
-    assert find_skip(lines) == 9
-    assert find_skip(lines[::-1]) == 0
-    lines = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i\n', '1, 2, 3', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's']
-    assert find_skip(lines) == 9
-    assert find_skip(lines[::-1]) == 10
+    text = 'a\nb\nc\nd\ne\nf\ng\nh\ni'
+    assert find_skip(text) == -1
+    assert find_skip(text, reverse=True) == -1
+    text = 'a\nb\nc\nd\ne\nf\ng\nh\ni\n1, 2, 3'
+    assert find_skip(text) == 9
+    assert find_skip(text, reverse=True) == 0
+    assert find_skip(text + '\n', reverse=True) == 0
+    text = 'a\nb\nc\nd\ne\nf\ng\nh\ni\n1, 2, 3\nj\nk\nl\nm\nn\no\np\nq\nr\ns'
+    assert find_skip(text) == 9
+    assert find_skip(text, reverse=True) == 10
+    assert find_skip(text + '\n', reverse=True) == 10
+    text = 'a\n1, 2\n3, 4\n5 6\nb\n'
+    assert find_skip(text) == 1
+    assert find_skip(text, reverse=True) == 1
+    assert find_skip('1, 2\n\n', reverse=True) == 1
+    assert find_skip('', reverse=True) == -1
     print('find_skip: OK')
 
     # find_sep
@@ -248,8 +460,23 @@ def test():
     assert find_sep('1\t-1\n') == '\t'
     print('find_sep: OK')
 
+    # line_start, line_start_from_end
+    text = 'a\n1\n2\nb\n'
+    assert text[line_start(text, 1):line_start_from_end(text, 1)] == '1\n2\n'
+    assert text[line_start(text, 0):line_start_from_end(text, 0)] == text
+    text = 'a\n1\n2\nb'
+    assert text[line_start(text, 1):line_start_from_end(text, 1)] == '1\n2\n'
+    print('line_start: OK')
+
+    # read_numeric
+    assert read_numeric('1, 2\n3, 4\n', ', ').shape == (2, 2)
+    assert read_numeric('1\t2\t3\n4\t5\t6', '\t').shape == (2, 3)
+    assert read_numeric('1\n2\n3\n', '').shape == (3, 1)
+    assert read_numeric('1;2\n3;4\n', ';')[1, 1] == 4
+    print('read_numeric: OK')
+
     # load_file
-    loader = DataLoader()
+    loader = DataLoader(cache_dir=None)
     loader.load_file('test.txt')
     assert loader.spec_dict['test.txt'].abs_path_raw == 'raw.txt'
     assert loader.spec_dict['test.txt'].abs_path_ref == 'ref.txt'
@@ -260,9 +487,112 @@ def test():
     assert loader.spec_dict['test.txt'].xdata[-1] == 200
     assert loader.spec_dict['test.txt'].ydata[0] == 100
     assert loader.spec_dict['test.txt'].ydata[-1] == -100
+    assert loader.spec_dict['test.txt'].ydata.dtype == np.float64
     print('load_file: OK')
 
-    loader.save('test.txt', 'test_save.txt')
+    # load_file (multiple columns)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename_multi = os.path.join(tmp_dir, 'test_multi.txt')
+        with open(filename_multi, 'w') as f:
+            f.write('text\n1\t10\t20\t30\n2\t11\t21\t31\n')
+        loader_multi = DataLoader(filename_multi, cache_dir=None)
+    assert list(loader_multi.spec_dict.keys()) == [filename_multi, f'{filename_multi}(1)', f'{filename_multi}(2)']
+    assert (loader_multi.spec_dict[f'{filename_multi}(2)'].ydata == [30, 31]).all()
+    assert loader_multi.spec_dict[f'{filename_multi}(2)'].ydata.flags['C_CONTIGUOUS']
+    assert (loader_multi.spec_dict[filename_multi].xdata == [1, 2]).all()
+    print('load_file (multiple columns): OK')
+
+    # load_file (line endings)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for newline in ['\n', '\r\n', '\r']:
+            filename_newline = os.path.join(tmp_dir, 'test_newline.txt')
+            with open(filename_newline, 'w', newline='') as f:
+                f.write(newline.join(['text\x0cpage', 'more\u2028text', '1,2', '3,4', 'footer']) + newline)
+            spec = DataLoader(filename_newline, cache_dir=None).spec_dict[filename_newline]
+            assert spec.description == ['text\x0cpage\n', 'more\u2028text\n']
+            assert (spec.ydata == [2, 4]).all()
+    print('load_file (line endings): OK')
+
+    # load_files
+    loader_multi = DataLoader(filenames=['test.txt', 'test.txt'], cache_dir=None)
+    assert list(loader_multi.spec_dict.keys()) == ['test.txt']
+    assert (loader_multi.spec_dict['test.txt'].ydata == loader.spec_dict['test.txt'].ydata).all()
+    assert loader_multi.load_files(['test.txt']) == {'test.txt': False}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename_bad = os.path.join(tmp_dir, 'bad.txt')
+        with open(filename_bad, 'w') as f:
+            f.write('no numeric data\n')
+        loader_bad = DataLoader(cache_dir=None)
+        try:
+            loader_bad.load_files(['test.txt', filename_bad])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('no error is raised for a file without numeric data')
+    assert list(loader_bad.spec_dict.keys()) == ['test.txt']
+    print('load_files: OK')
+
+    # concat_spec
+    df = loader.concat_spec()
+    assert df.shape == (3, 2)
+    assert df['x'].iloc[-1] == 200
+    assert df['y'].iloc[-1] == -100
+    print('concat_spec: OK')
+
+    # cache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        loader_cached = DataLoader(cache_dir=Path(cache_dir))
+        loader_cached.load_file('test.txt')
+        assert len(list(Path(cache_dir).glob(f'*{CACHE_SUFFIX}'))) == 1
+        loader_cached.delete_file('test.txt')
+        loader_cached.load_file('test.txt')  # loaded from the cache
+        spec, spec_cached = loader.spec_dict['test.txt'], loader_cached.spec_dict['test.txt']
+        assert (spec.xdata == spec_cached.xdata).all()
+        assert (spec.ydata == spec_cached.ydata).all()
+        assert spec.calibration == spec_cached.calibration
+        assert spec.fitting_range == spec_cached.fitting_range
+        for i in range(3):
+            Path(cache_dir, f'old{i}{CACHE_SUFFIX}').touch()
+            os.utime(Path(cache_dir, f'old{i}{CACHE_SUFFIX}'), ns=(i, i))
+        Path(cache_dir, 'user_data.npz').touch()
+        os.utime(Path(cache_dir, 'user_data.npz'), ns=(0, 0))
+        assert prune_cache(Path(cache_dir), max_files=2) == 2
+        assert sorted(entry.name for entry in Path(cache_dir).iterdir()) == sorted([cache_path('test.txt', cache_dir).name, f'old2{CACHE_SUFFIX}', 'user_data.npz'])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_dir = Path(tmp_dir, 'cache')
+        filenames = []
+        for i in range(4):
+            filenames.append(os.path.join(tmp_dir, f'test{i}.txt'))
+            with open(filenames[-1], 'w') as f:
+                f.write(f'{i},{i}\n')
+        loader_cached = DataLoader(cache_dir=cache_dir)
+        loader_cached.cache_max_files = 2
+        loader_cached.load_files(filenames[:3])
+        assert loader_cached.cache_count == 2 and count_cache(cache_dir) == 2  # pruned once after all writes
+        loader_cached.load_file(filenames[3])
+        assert loader_cached.cache_count == 2 and count_cache(cache_dir) == 2
+        assert len(loader_cached.spec_dict) == 4
+    print('cache: OK')
+
+    # save
+    filename_as = loader.save('test.txt', 'test_save.txt')
+    loader.load_file(filename_as)
+    assert (loader.spec_dict[filename_as].xdata == loader.spec_dict['test.txt'].xdata).all()
+    assert (loader.spec_dict[filename_as].ydata == loader.spec_dict['test.txt'].ydata).all()
+    assert loader.spec_dict[filename_as].fitting_values == [0.0, 0.0, 0.0, 0.0]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for device, rows in [('', ['1234.5678,0.1', '1500.1234,16777217']), ('CCS', ['1234.5678,0.1', '1500.1234,65535'])]:
+            filename_raw = os.path.join(tmp_dir, f'test_{device}.txt')
+            with open(filename_raw, 'w') as f:
+                f.write(f'# device: {device}\n' + '\n'.join(rows) + '\n')
+            loader_save = DataLoader(filename_raw, cache_dir=None)
+            assert loader_save.spec_dict[filename_raw].xdata.dtype == np.float64
+            filename_as = loader_save.save(filename_raw, os.path.join(tmp_dir, 'saved.txt'))
+            with open(filename_as) as f:
+                saved = [line for line in f.read().splitlines() if not line.startswith('#')]
+            assert [tuple(map(float, line.split(','))) for line in saved] == [tuple(map(float, row.split(','))) for row in rows]
+            assert saved[0] == '1234.5678,0.1'
+    print('save: OK')
 
 
 if __name__ == '__main__':
@@ -1,13 +1,41 @@
+import tempfile
 from pathlib import Path
 import h5py
+import numpy as np
+
+
+def read_dataset(dataset: h5py.Dataset) -> np.ndarray:
+    out = np.empty(dataset.shape, dtype=dataset.dtype)
+    if out.size > 0:
+        dataset.read_direct(out)
+    return out
+
+
+class LazyArray:
+    # reads only the requested part of the dataset
+    def __init__(self, dataset: h5py.Dataset):
+        self.dataset = dataset
+        self.shape = dataset.shape
+        self.dtype = dataset.dtype
+        self.ndim = dataset.ndim
+
+    def __getitem__(self, item):
+        return self.dataset[item]
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __array__(self, dtype=None, copy=None):
+        out = read_dataset(self.dataset)
+        return out if dtype is None else out.astype(dtype, copy=False)
 
 
 class HDFReader:
-    def __init__(self, p: Path):
+    def __init__(self, p: Path, **kwargs):
         if p.suffix != '.hdf5':
             raise ValueError('File extension must be .hdf5')
         self.path = p
-        self.file = h5py.File(p, 'r')
+        self.file = h5py.File(p, 'r', **kwargs)
 
     def __getitem__(self, item):
         return self.file[item]
@@ -31,24 +59,37 @@ class HDFWriter:
 
 
 class RamanHDFReader(HDFReader):
-    def __init__(self, p: Path):
-        super().__init__(p)
-        self.xdata = self.file['xdata'][:]
-        self.spectra = self.file['spectra'][:]
-
-        self.time = self.file.attrs['time']
-        self.integration = self.file.attrs['integration']
-        self.accumulation = self.file.attrs['accumulation']
-        self.pixel_size = self.file.attrs['pixel_size']
-        self.shape = self.file.attrs['shape'][:]
-        self.map_info = {
-            'x_start': self.file.attrs['x_start'],
-            'y_start': self.file.attrs['y_start'],
-            'x_pad': self.file.attrs['x_pad'],
-            'y_pad': self.file.attrs['y_pad'],
-            'x_span': self.file.attrs['x_span'],
-            'y_span': self.file.attrs['y_span']
-        }
+    def __init__(self, p: Path, lazy: bool = False):
+        super().__init__(p, rdcc_nbytes=64 * 1024 * 1024)  # larger chunk cache for slicing spectra
+        self.xdata = read_dataset(self.file['xdata'])
+        self.spectra_lazy = LazyArray(self.file['spectra'])  # reads only the requested slice
+        # with lazy=True the whole spectra are read on first access, so the file must still be open then
+        self._spectra = None if lazy else self.load_all()
+
+        attrs = dict(self.file.attrs)  # read all attributes at once
+        self.time = attrs['time']
+        self.integration = attrs['integration']
+        self.accumulation = attrs['accumulation']
+        self.pixel_size = attrs['pixel_size']
+        self.shape = attrs['shape'][:]
+        self.map_info = {key: attrs[key] for key in ['x_start', 'y_start', 'x_pad', 'y_pad', 'x_span', 'y_span']}
+
+    @property
+    def spectra(self) -> np.ndarray:
+        if self._spectra is None:
+            self._spectra = self.load_all()
+        return self._spectra
+
+    @spectra.setter
+    def spectra(self, value: np.ndarray):
+        self._spectra = value
+
+    def load_all(self, out: np.ndarray = None) -> np.ndarray:
+        dataset = self.spectra_lazy.dataset
+        if out is None:
+            return read_dataset(dataset)
+        dataset.read_direct(out)
+        return out
 
 
 class RamanHDFWriter(HDFWriter):
@@ -60,3 +101,55 @@ class RamanHDFWriter(HDFWriter):
 
     def create_dataset(self, name, data):
         self.file.create_dataset(name, data=data)
+
+
+def test():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        p = Path(tmp_dir) / 'test.hdf5'
+        xdata = np.linspace(100, 200, 5)
+        spectra = np.arange(2 * 3 * 5, dtype=np.float64).reshape(2, 3, 5)
+        writer = RamanHDFWriter(p)
+        writer.create_dataset('xdata', xdata)
+        writer.create_dataset('spectra', spectra)
+        for key in ['time', 'integration', 'accumulation', 'pixel_size', 'x_start', 'y_start', 'x_pad', 'y_pad', 'x_span', 'y_span']:
+            writer.create_attr(key, 1.0)
+        writer.create_attr('shape', np.array([2, 3]))
+        writer.close()
+
+        # read_dataset
+        reader = HDFReader(p)
+        assert (read_dataset(reader['xdata']) == xdata).all()
+        assert read_dataset(reader['spectra']).shape == (2, 3, 5)
+        reader.close()
+        print('read_dataset: OK')
+
+        # RamanHDFReader
+        reader = RamanHDFReader(p)
+        reader.close()
+        assert (reader.xdata == xdata).all()
+        assert reader.xdata.dtype == xdata.dtype
+        assert isinstance(reader.spectra, np.ndarray)
+        assert (reader.spectra == spectra).all()
+        assert reader.spectra.reshape(-1, 5).mean(axis=0)[0] == spectra.reshape(-1, 5).mean(axis=0)[0]
+        assert (reader.shape == [2, 3]).all()
+        assert reader.map_info == {key: 1.0 for key in ['x_start', 'y_start', 'x_pad', 'y_pad', 'x_span', 'y_span']}
+        print('RamanHDFReader: OK')
+
+        # LazyArray, load_all
+        reader = RamanHDFReader(p, lazy=True)
+        assert reader._spectra is None
+        assert reader.spectra_lazy.shape == (2, 3, 5)
+        assert len(reader.spectra_lazy) == 2
+        assert (reader.spectra_lazy[1, 2] == spectra[1, 2]).all()
+        assert (np.asarray(reader.spectra_lazy) == spectra).all()
+        out = np.empty(spectra.shape, dtype=reader.spectra_lazy.dtype)
+        assert reader.load_all(out) is out
+        assert (out == spectra).all()
+        assert (reader.spectra == spectra).all()
+        reader.close()
+        assert (reader.spectra == spectra).all()
+        print('LazyArray: OK')
+
+
+if __name__ == '__main__':
+    test()